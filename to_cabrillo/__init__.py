@@ -7,33 +7,33 @@
 import argparse
 import os
 import sys
+import tomllib
 from contextlib import ExitStack
-from datetime import datetime
-from functools import wraps
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
-from typing import (Any, Callable, ClassVar, Dict, Optional, ParamSpec, Set,
-                    TextIO, TypeVar)
+from types import MappingProxyType
+from typing import Any, Callable, Mapping, Optional, ParamSpec, TextIO, TypeVar
 
 import jinja2
-import toml
 from adif_parser import AData, ParseADIF
 
 P = ParamSpec('P')
 R = TypeVar('R')
 type FilterArg = str | int | float
 
-config = None           # pylint: disable=invalid-name
+BUFFER_SIZE = 1 << 16
+BATCH_SIZE = 1024
+
+config: Optional['Config'] = None  # pylint: disable=invalid-name
 jinja = jinja2.Environment()
 
 
 def register(name: str) -> Callable[[Callable[P, R]], Callable[P, R]]:
   """Register new filters for jinja"""
   def decorator(func: Callable[P, R]) -> Callable[P, R]:
-    @wraps(func)
-    def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
-      return func(*args, **kwargs)
-    jinja.filters[name] = wrapper
-    return wrapper
+    jinja.filters[name] = func
+    return func
   return decorator
 
 
@@ -49,54 +49,61 @@ def rpad_filter(value: FilterArg, width: int, fillchar: str = ' ') -> str:
 
 @register('date')
 def date_filter(value: str) -> str:
-  return datetime.strptime(value, '%Y%m%d').date().strftime('%Y-%m-%d')
+  return f'{value[0:4]}-{value[4:6]}-{value[6:8]}'
+
 
+CONFIG_KEYS = frozenset(['header', 'footer', 'line'])
 
+
+@dataclass(frozen=True, slots=True, eq=False)
 class Config:
-  _instance: ClassVar[Optional['Config']] = None
-  _config_keys: ClassVar[Set[str]] = set(['header', 'footer', 'line'])
-  _config: ClassVar[Dict[str, Any]]
-  variables: ClassVar[Dict[str, Any]]
-  templates: ClassVar[Dict[str, str]]
+  variables: Mapping[str, Any]
+  templates: Mapping[str, str]
+  compiled: Mapping[str, jinja2.Template] = field(repr=False)
 
-  def __new__(cls, filename: Path) -> 'Config':
-    if cls._instance:
-      return cls._instance
 
-    with filename.open('r') as fd:
-      cls._config = toml.load(fd)
-      cls.variables = cls._config['variables']
-      cls.templates = {}
-      for key, val in cls._config['templates'].items():
-        cls.templates[key] = val
-      if cls._config_keys & set(cls.templates.keys()) != cls._config_keys:
-        raise SystemError('Missing variables in the configuration file')
+@lru_cache(maxsize=None)
+def load_config(filename: Path) -> Config:
+  with filename.open('rb') as fd:
+    data = tomllib.load(fd)
 
-    obj = super().__new__(cls)
-    cls._instance = obj
-    return cls._instance
+  templates = dict(data['templates'])
+  if CONFIG_KEYS & set(templates.keys()) != CONFIG_KEYS:
+    raise SystemError('Missing variables in the configuration file')
+  # The line template is written over several lines for readability
+  templates['line'] = ' '.join(templates['line'].split('\n'))
 
-  def __repr__(self) -> str:
-    return str(self._config)
+  compiled = {
+    'header': jinja.from_string(templates['header']),
+    'line': jinja.from_string(templates['line']),
+  }
+  return Config(MappingProxyType(data['variables']), MappingProxyType(templates),
+                MappingProxyType(compiled))
 
 
 def process_lines(data: AData, file: TextIO) -> None:
   assert config is not None
-  line = config.templates['line'].split('\n')
-  line = ' '.join(line)
-  template = jinja.from_string(line)
+  render = config.compiled['line'].render
+  write = file.write
+  batch: list[str] = []
+  append = batch.append
 
   for row in data:
-    start_date = datetime.strptime(row["QSO_DATE"] + ' ' + row["TIME_ON"], '%Y%m%d %H%M%S')
-    row['DATE_TIME'] = start_date.strftime('%Y-%m-%d %H%M')
-    line = template.render(**row)
-    print(line, file=file)
+    # ADIF dates and times are fixed width: YYYYMMDD and HHMM[SS]
+    qso_date, time_on = row["QSO_DATE"], row["TIME_ON"]
+    row['DATE_TIME'] = f'{qso_date[0:4]}-{qso_date[4:6]}-{qso_date[6:8]} {time_on[0:4]}'
+    append(render(row))
+    if len(batch) >= BATCH_SIZE:
+      write('\n'.join(batch) + '\n')
+      batch.clear()
+
+  if batch:
+    write('\n'.join(batch) + '\n')
 
 
 def make_header(file: TextIO) -> None:
   assert config is not None
-  template = jinja.from_string(config.templates['header'])
-  header = template.render(**config.variables)
+  header = config.compiled['header'].render(**config.variables)
   print(header, file=file, end='\n\n')
 
 
@@ -112,7 +119,7 @@ def gen_cabrillo(cab_file: Path, adif: AData) -> None:
     else:
       outfile = cab_file.expanduser().absolute()
       print(f'Write {outfile}')
-      fdout = stack.enter_context(outfile.open('w', encoding='UTF-8'))
+      fdout = stack.enter_context(outfile.open('w', buffering=BUFFER_SIZE, encoding='UTF-8'))
 
     make_header(fdout)
     process_lines(adif, fdout)
@@ -132,7 +139,7 @@ def main() -> None:
   opts = parser.parse_args()
 
   try:
-    config = Config(opts.config)
+    config = load_config(opts.config)
   except FileNotFoundError as err:
     print(err, file=sys.stderr)
     sys.exit(os.EX_IOERR)